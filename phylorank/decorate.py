@@ -24,11 +24,10 @@ import dendropy
 from biolib.common import canonical_gid
 from biolib.newick import parse_label, create_label
 from biolib.taxonomy import Taxonomy
-from numpy import (median as np_median)
 
 from phylorank.common import (read_taxa_file,
                               filter_taxa_for_dist_inference)
-from phylorank.outliers import Outliers
+from phylorank.outliers import Outliers, node_median_rd
 from phylorank.viral_taxonomy import (translate_viral_taxonomy,
                                       rev_translate_output_file)
 
@@ -467,9 +466,10 @@ class Decorate(object):
                                                   taxa_for_dist_inference)
 
         # set edge lengths to median value over all rootings
+        node_medians = node_median_rd(rel_node_dists)
         tree.seed_node.rel_dist = 0.0
         for n in tree.preorder_node_iter(lambda n: n != tree.seed_node):
-            n.rel_dist = np_median(rel_node_dists[n.id])
+            n.rel_dist = node_medians[n.id]
 
         return median_for_rank
 
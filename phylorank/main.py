@@ -15,6 +15,7 @@
 #                                                                             #
 ###############################################################################
 
+import json
 import logging
 import os
 import sys
@@ -120,7 +121,7 @@ class OptionsParser(object):
         check_file_exists(options.red_table2)
         check_file_exists(options.red_dict2)
 
-        median_reds = eval(open(options.red_dict2).readline())
+        median_reds = json.loads(open(options.red_dict2).readline())
 
         red1 = {}
         red2 = {}
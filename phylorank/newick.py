@@ -16,11 +16,14 @@
 ###############################################################################
 
 
+from functools import lru_cache
+
 from biolib.common import is_float
 
 '''Helper functions for parsing Newick information.'''
 
 
+@lru_cache(maxsize=None)
 def parse_label(label):
     """Parse a Newick label which may contain a support value, taxon, and/or auxiliary information.
 
@@ -45,17 +48,18 @@ def parse_label(label):
 
     if label:
         label = label.strip()
-        if '|' in label:
-            label, auxiliary_info = label.split('|')
-
-        if ':' in label:
-            support, taxon = label.split(':')
-            support = float(support)
-        else:
-            if is_float(label):
-                support = float(label)
-            elif label != '':
-                taxon = label
+        label, sep, aux = label.partition('|')
+        if sep:
+            auxiliary_info = aux
+
+        support_str, sep, taxon_str = label.partition(':')
+        if sep:
+            support = float(support_str)
+            taxon = taxon_str
+        elif is_float(label):
+            support = float(label)
+        elif label != '':
+            taxon = label
 
     return support, taxon, auxiliary_info
 
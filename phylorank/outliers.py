@@ -15,12 +15,15 @@
 #                                                                             #
 ###############################################################################
 
+import json
 import logging
+import multiprocessing
 import os
 import random
 import sys
 import copy
 from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 import dendropy
 from biolib.plots.abstract_plot import AbstractPlot
@@ -28,9 +31,20 @@ from biolib.taxonomy import Taxonomy
 from numpy import (median as np_median,
                    array as np_array,
                    arange as np_arange,
+                   fromiter as np_fromiter,
                    percentile as np_percentile,
-                   ones_like as np_ones_like,
-                   histogram as np_histogram)
+                   histogram as np_histogram,
+                   abs as np_abs,
+                   zeros as np_zeros,
+                   searchsorted as np_searchsorted,
+                   clip as np_clip,
+                   where as np_where,
+                   empty as np_empty,
+                   full as np_full,
+                   concatenate as np_concatenate,
+                   nanmedian as np_nanmedian,
+                   isnan as np_isnan,
+                   nan as np_nan)
 
 from phylorank.common import (read_taxa_file,
                               filter_taxa_for_dist_inference,
@@ -42,38 +56,213 @@ from phylorank.viral_taxonomy import (VIRAL_RANK_LABELS,
                                       translate_viral_tree,
                                       rev_translate_output_file,
                                       read_viral_taxonomy_from_tree)
-import mpld3
-
-
-class AxisReplacer(mpld3.plugins.PluginBase):
-    """Replaces the y axis labels with the provided list"""
-
-    JAVASCRIPT = """
-    mpld3.register_plugin("axisreplacer", AxisReplacer);
-    AxisReplacer.prototype = Object.create(mpld3.Plugin.prototype);
-    AxisReplacer.prototype.constructor = AxisReplacer;
-    AxisReplacer.prototype.requiredProps = ["data"];
-    AxisReplacer.prototype.defaultProps = {}
-    function AxisReplacer(fig, props){
-        mpld3.Plugin.call(this, fig, props);
-    };
-
-    AxisReplacer.prototype.draw = function(){
-        let data = this.props.data;
-        let parent = document.getElementsByClassName("mpld3-yaxis")[0];
-        let gTicks = parent.getElementsByTagName("g");
-        for (let i=0; i < gTicks.length; i++) {
-            let curTick = gTicks[i];
-            let curText = curTick.getElementsByTagName("text")[0];
-            curText.innerHTML = data[i];
-        }        
-    };
+
+# default plotting options for AbstractPlot
+Options = namedtuple('Options', 'width height tick_font_size label_font_size dpi')
+DEFAULT_PLOT_OPTIONS = Options(5, 4, 12, 12, 96)
+
+# classification labels indexed by the codes returned by _classify_taxa
+CLASSIFICATION_LABELS = ('OK',
+                         'overclassified',
+                         'very overclassified',
+                         'underclassified',
+                         'very underclassified')
+
+# Taxonomy holds no state so a single instance can be shared
+# by all methods
+TAXONOMY_UTILS = Taxonomy()
+
+
+def node_median_rd(rel_node_dists):
+    """Median relative divergence of each node over all rootings.
+
+    Parameters
+    ----------
+    rel_node_dists : ndarray
+        Relative divergence of each node under each rooting with rows
+        aligned to preorder node ids. NaN marks rootings where a node
+        fell in the outgroup.
+
+    Returns
+    -------
+    ndarray
+        Median relative divergence of each node, or NaN for nodes
+        absent from every rooting (e.g. the seed node).
+    """
+
+    medians = np_full(rel_node_dists.shape[0], np_nan)
+    observed = ~np_isnan(rel_node_dists).all(axis=1)
+    medians[observed] = np_nanmedian(rel_node_dists[observed], axis=1)
+
+    return medians
+
+
+def _phylum_rooting_init(outliers, tree, taxonomy):
+    """Set shared state for _phylum_rooting_worker in a forked worker."""
+
+    global _phylum_rooting_state
+    _phylum_rooting_state = (outliers, tree, taxonomy)
+
+
+def _phylum_rooting_worker(p):
+    """Calculate relative divergences with the tree rooted on a phylum.
+
+    Runs in a forked worker process which inherits the parsed tree
+    from _phylum_rooting_init.
+
+    Parameters
+    ----------
+    p : str
+        Phylum to use as the outgroup.
+
+    Returns
+    -------
+    dict : d[rank_index][taxon] -> relative divergence
+        Relative divergence of named clades under this rooting.
+    list of (int, float)
+        Relative divergence of each ingroup node keyed by node id.
+    """
+
+    outliers, tree, taxonomy = _phylum_rooting_state
+
+    cur_tree = outliers.root_with_outgroup(tree, taxonomy, p)
+
+    # calculate relative distance to taxa
+    rd = RelativeDistance()
+    rel_dists = rd.rel_dist_to_named_clades(cur_tree)
+    rel_dists.pop(0, None)  # remove results for Domain
+
+    # remove named groups in outgroup
+    remove_set = frozenset(TAXONOMY_UTILS.children(p, taxonomy)) | {p}
+    for r in rel_dists:
+        rel_dists[r] = {k: v for k, v in rel_dists[r].items()
+                        if k not in remove_set}
+
+    # calculate relative distance to all nodes
+    rd.decorate_rel_dist(cur_tree)
+
+    # determine which lineages represents the 'ingroup'
+    ingroup_subtree = None
+    for c in cur_tree.seed_node.child_node_iter():
+        # if the phylum is absent from the raw label it cannot be in
+        # the taxon either, so the label need not be parsed
+        if not c.label or p not in c.label:
+            ingroup_subtree = c
+            break
+
+        _support, taxon_name, _auxiliary_info = parse_label(c.label)
+        if not taxon_name or p not in taxon_name:
+            ingroup_subtree = c
+            break
+
+    # do a preorder traversal of 'ingroup' and record relative divergence to nodes
+    node_dists = [(n.id, n.rel_dist) for n in ingroup_subtree.preorder_iter()]
+
+    return rel_dists, node_dists
+
+
+def _restrict_taxa_to_plot(rel_dists, taxa_to_plot):
+    """Restrict relative divergences to the taxa being plotted.
+
+    Ranks are filtered in place so existing references to rel_dists
+    observe the restriction.
+
+    Parameters
+    ----------
+    rel_dists : d[rank_index][taxon] -> relative divergence
+        Relative divergence of taxa at each rank.
+    taxa_to_plot : frozenset
+        Taxa to retain.
+    """
+
+    for r in rel_dists:
+        rel_dists[r] = {k: v for k, v in rel_dists[r].items()
+                        if k in taxa_to_plot}
+
+
+def _classify_taxa(taxon_values, rank_medians, rank_median):
+    """Classify taxa relative to the median relative divergence of each rank.
+
+    Parameters
+    ----------
+    taxon_values : ndarray
+        Relative divergence of each taxon.
+    rank_medians : ndarray
+        Median relative divergence of each rank.
+    rank_median : float
+        Median relative divergence of the rank the taxa belong to.
+
+    Returns
+    -------
+    ndarray
+        Index into rank_medians of the closest rank for each taxon.
+    ndarray
+        Classification code for each taxon (index into CLASSIFICATION_LABELS).
+    ndarray
+        Difference between each taxon and the median of its rank.
     """
 
-    def __init__(self, linedata):
+    deltas = taxon_values - rank_median
+
+    # locate closest rank with a binary search over the sorted rank
+    # medians and compare only the two neighbouring candidates
+    order = rank_medians.argsort()
+    sorted_medians = rank_medians[order]
+    idx = np_searchsorted(sorted_medians, taxon_values)
+    left = np_clip(idx - 1, 0, sorted_medians.size - 1)
+    right = np_clip(idx, 0, sorted_medians.size - 1)
+    use_right = np_abs(taxon_values - sorted_medians[right]) < np_abs(taxon_values - sorted_medians[left])
+    closest = order[np_where(use_right, right, left)]
+
+    codes = np_zeros(taxon_values.size, dtype=int)
+    codes[deltas < -0.1] = 1
+    codes[deltas < -0.2] = 2
+    codes[deltas > 0.1] = 3
+    codes[deltas > 0.2] = 4
+
+    return closest, codes, deltas
+
+
+def _axis_replacer_plugin(linedata):
+    """Create mpld3 plugin replacing the y axis labels with the provided list.
+
+    Defined lazily so mpld3 is only required when interactive
+    plots are requested.
+    """
+
+    import mpld3
+
+    class AxisReplacer(mpld3.plugins.PluginBase):
+        """Replaces the y axis labels with the provided list"""
+
+        JAVASCRIPT = """
+        mpld3.register_plugin("axisreplacer", AxisReplacer);
+        AxisReplacer.prototype = Object.create(mpld3.Plugin.prototype);
+        AxisReplacer.prototype.constructor = AxisReplacer;
+        AxisReplacer.prototype.requiredProps = ["data"];
+        AxisReplacer.prototype.defaultProps = {}
+        function AxisReplacer(fig, props){
+            mpld3.Plugin.call(this, fig, props);
+        };
+
+        AxisReplacer.prototype.draw = function(){
+            let data = this.props.data;
+            let parent = document.getElementsByClassName("mpld3-yaxis")[0];
+            let gTicks = parent.getElementsByTagName("g");
+            for (let i=0; i < gTicks.length; i++) {
+                let curTick = gTicks[i];
+                let curText = curTick.getElementsByTagName("text")[0];
+                curText.innerHTML = data[i];
+            }        
+        };
+        """
+
+        def __init__(self, linedata):
+            self.dict_ = {"type": "axisreplacer",
+                          "data": linedata}
+
+    return AxisReplacer(linedata)
 
-        self.dict_ = {"type": "axisreplacer",
-                      "data": linedata}
 
 class Outliers(AbstractPlot):
     """Identify outliers based on relative distances.
@@ -96,10 +285,7 @@ class Outliers(AbstractPlot):
         if not self.skip_mpld3:
             import mpld3
 
-        Options = namedtuple('Options', 'width height tick_font_size label_font_size dpi')
-        options = Options(5, 4, 12, 12, 96)
-
-        AbstractPlot.__init__(self, options)
+        AbstractPlot.__init__(self, DEFAULT_PLOT_OPTIONS)
 
         self.poly_color = (89.0 / 255, 89.0 / 255, 89.0 / 255)
         self.near_mono_color = (255.0 / 255, 188.0 / 255, 121.0 / 255)
@@ -110,6 +296,55 @@ class Outliers(AbstractPlot):
         self.dpi = dpi
         self.output_dir = output_dir
 
+        # cache for taxa_median_rd holding its most recent input and
+        # result; several methods are handed the same phylum_rel_dists
+        # and would otherwise each redo the full accumulation
+        self._taxa_median_rd_cache = (None, None)
+
+    def _taxon_category_masks(self,
+                              taxa_labels,
+                              highlight_polyphyly,
+                              highlight_taxa,
+                              fmeasure,
+                              fmeasure_mono):
+        """Classify taxa as monophyletic, nearly monophyletic, or polyphyletic.
+
+        Parameters
+        ----------
+        taxa_labels : list
+            Label of each taxon to classify.
+        highlight_polyphyly : boolean
+            Classify taxa based on their F-measure.
+        highlight_taxa : set
+            Taxa to always report as polyphyletic.
+        fmeasure : d[taxon] -> F-measure
+            F-measure of taxa.
+        fmeasure_mono : float
+            F-measure threshold for defining monophyly.
+
+        Returns
+        -------
+        Boolean masks over taxa_labels indicating monophyletic,
+        nearly monophyletic, and polyphyletic taxa.
+        """
+
+        num_taxa = len(taxa_labels)
+        hl_mask = np_fromiter((t in highlight_taxa for t in taxa_labels),
+                              dtype=bool,
+                              count=num_taxa)
+        if highlight_polyphyly:
+            fm = np_fromiter((fmeasure[t] for t in taxa_labels),
+                             dtype=float,
+                             count=num_taxa)
+            poly_mask = (fm < fmeasure_mono) | hl_mask
+            near_mono_mask = (fm != 1.0) & ~poly_mask
+        else:
+            poly_mask = hl_mask
+            near_mono_mask = np_zeros(num_taxa, dtype=bool)
+        mono_mask = ~(poly_mask | near_mono_mask)
+
+        return mono_mask, near_mono_mask, poly_mask
+
     def root_with_outgroup(self, input_tree, taxonomy, outgroup_taxa):
         """Reroot the tree using the given outgroup.
 
@@ -130,19 +365,17 @@ class Outliers(AbstractPlot):
 
         new_tree = input_tree.clone()
 
-        outgroup = set()
-        for genome_id, taxa in taxonomy.items():
-            if outgroup_taxa in taxa:
-                outgroup.add(genome_id)
+        outgroup = {genome_id for genome_id, taxa in taxonomy.items()
+                    if outgroup_taxa in taxa}
         self.logger.info('Identifying %d genomes in the outgroup.' % len(outgroup))
 
         outgroup_in_tree = set()
-        ingroup_in_tree = set()
+        ingroup_in_tree = []
         for n in new_tree.leaf_node_iter():
             if n.taxon.label in outgroup:
                 outgroup_in_tree.add(n.taxon)
             else:
-                ingroup_in_tree.add(n)
+                ingroup_in_tree.append(n)
         self.logger.info('Identified %d outgroup taxa in the tree.' % len(outgroup_in_tree))
 
         if len(outgroup_in_tree) == 0:
@@ -158,15 +391,16 @@ class Outliers(AbstractPlot):
         # This random rerooting is performed until the MRCA does not spans all taxa in
         # the tree.
 
-        leaves_in_tree = sum([1 for _ in new_tree.leaf_node_iter()])
+        ingroup_tuple = tuple(ingroup_in_tree)
+        leaves_in_tree = len(outgroup_in_tree) + len(ingroup_in_tree)
         while True:
-            rnd_ingroup_leaf = random.sample(ingroup_in_tree, 1)[0]
+            rnd_ingroup_leaf = random.choice(ingroup_tuple)
             new_tree.reroot_at_edge(rnd_ingroup_leaf.edge,
                                     length1=0.5 * rnd_ingroup_leaf.edge_length,
                                     length2=0.5 * rnd_ingroup_leaf.edge_length)
 
             mrca = new_tree.mrca(taxa=outgroup_in_tree)
-            leaves_in_mrca = sum([1 for _ in mrca.leaf_iter()])
+            leaves_in_mrca = len(mrca.leaf_nodes())
             if leaves_in_mrca != leaves_in_tree:
                 break
 
@@ -215,15 +449,31 @@ class Outliers(AbstractPlot):
             Desired name of output plot.
         """
 
+        taxa_for_dist_inference = frozenset(taxa_for_dist_inference)
+
         self.fig.clear()
         self.fig.set_size_inches(12, 6)
         ax = self.fig.add_subplot(111)
 
+        # histogram bin edges are identical for every rank
+        binwidth = 0.025
+        bins = np_arange(0, 1.0 + binwidth, binwidth)
+
+        # cache rank ordering and labels used by each of the loops below
+        sorted_ranks = sorted(rel_dists.keys())
+        if viral:
+            rank_label_cache = [VIRAL_RANK_LABELS[r] for r in sorted_ranks]
+        else:
+            rank_label_cache = [Taxonomy.rank_labels[r] for r in sorted_ranks]
+        highlight_taxa = frozenset(highlight_taxa)
+
         # create percentile and classifciation boundary lines
         percentiles = {}
-        for i, rank in enumerate(sorted(rel_dists.keys())):
-            v = [dist for taxa, dist in rel_dists[rank].items() if taxa in taxa_for_dist_inference]
-            if len(v) == 0:
+        for i, rank in enumerate(sorted_ranks):
+            v = np_fromiter((dist for taxa, dist in rel_dists[rank].items()
+                             if taxa in taxa_for_dist_inference),
+                            dtype=float)
+            if v.size == 0:
                 continue
 
             p10, p50, p90 = np_percentile(v, [10, 50, 90])
@@ -244,32 +494,32 @@ class Outliers(AbstractPlot):
         c = []
         labels = []
         rank_labels = []
-        for i, rank in enumerate(sorted(rel_dists.keys())):
-            if viral:
-                rank_label = VIRAL_RANK_LABELS[rank]
-            else:
-                rank_label = Taxonomy.rank_labels[rank]
-            rank_labels.append(rank_label.capitalize() + ' ({:,})'.format(len(rel_dists[rank])))
-
-            mono = []
-            poly = []
-            nearly_mono = []
-            for clade_label, dist in rel_dists[rank].items():
-                x.append(dist)
-                y.append(i)
-                labels.append(clade_label)
-
-                if ((highlight_polyphyly and fmeasure[clade_label] < fmeasure_mono) or clade_label in highlight_taxa):
-                    c.append(self.poly_color)
-                    poly.append(dist)
-                elif (highlight_polyphyly and fmeasure[clade_label] != 1.0):
-                    c.append(self.near_mono_color)
-                    nearly_mono.append(dist)
-                else:
-                    c.append(self.mono_color)
-                    mono.append(dist)
-
-                # report results
+        for i, rank in enumerate(sorted_ranks):
+            rank_labels.append(rank_label_cache[i].capitalize() + ' ({:,})'.format(len(rel_dists[rank])))
+
+            taxa_labels = list(rel_dists[rank].keys())
+            num_taxa = len(taxa_labels)
+            dists = np_fromiter(rel_dists[rank].values(), dtype=float, count=num_taxa)
+
+            mono_mask, nearly_mono_mask, poly_mask = self._taxon_category_masks(taxa_labels,
+                                                                                highlight_polyphyly,
+                                                                                highlight_taxa,
+                                                                                fmeasure,
+                                                                                fmeasure_mono)
+
+            colors = np_empty((num_taxa, 3))
+            colors[mono_mask] = self.mono_color
+            colors[nearly_mono_mask] = self.near_mono_color
+            colors[poly_mask] = self.poly_color
+
+            x.append(dists)
+            y.append(np_full(num_taxa, i, dtype=float))
+            c.append(colors)
+            labels.extend(taxa_labels)
+
+            # report results
+            for j, clade_label in enumerate(taxa_labels):
+                dist = dists[j]
                 v = [clade_label, dist]
                 if i in percentiles:
                     p10, p50, p90 = percentiles[i]
@@ -281,50 +531,58 @@ class Outliers(AbstractPlot):
 
                 fout.write('%s\t%.2f\t%.2f\t%.2f\t%.2f\t%s\n' % tuple(v))
 
-            # histogram for each rank
-            binwidth = 0.025
-            bins = np_arange(0, 1.0 + binwidth, binwidth)
-            max_bin_count = max(np_histogram(mono + nearly_mono + poly, bins=bins)[0])
-
-            num_taxa = len(mono) + len(poly) + len(nearly_mono)
             if num_taxa == 0:
                 break
 
-            mono = np_array(mono)
-            nearly_mono = np_array(nearly_mono)
-            poly = np_array(poly)
+            mono = dists[mono_mask]
+            nearly_mono = dists[nearly_mono_mask]
+            poly = dists[poly_mask]
+
+            # histogram for each rank
+            max_bin_count = max(np_histogram(dists, bins=bins)[0])
+            if max_bin_count == 0:
+                # all bins empty; avoid division by zero below
+                max_bin_count = 1
 
             bottom_mono = 0
             if len(mono) > 0:
-                bottom_mono, b, p = ax.hist(mono, bins=bins,
-                                            color=self.mono_color,
-                                            alpha=0.5,
-                                            weights=0.9 * (1.0 / max_bin_count) * np_ones_like(mono),
-                                            bottom=i,
-                                            lw=0,
-                                            zorder=0)
+                bottom_mono = np_histogram(mono, bins=bins)[0] * (0.9 / max_bin_count)
+                ax.bar(bins[:-1], bottom_mono,
+                       width=binwidth,
+                       align='edge',
+                       color=self.mono_color,
+                       alpha=0.5,
+                       bottom=i,
+                       lw=0,
+                       zorder=0)
 
             bottom_nearly_mono = 0
             if len(nearly_mono) > 0:
-                bottom_nearly_mono, b, p = ax.hist(nearly_mono, bins=bins,
-                                                   color=self.near_mono_color,
-                                                   alpha=0.5,
-                                                   weights=0.9 * (1.0 / max_bin_count) * np_ones_like(nearly_mono),
-                                                   bottom=i + bottom_mono,
-                                                   lw=0,
-                                                   zorder=0)
+                bottom_nearly_mono = np_histogram(nearly_mono, bins=bins)[0] * (0.9 / max_bin_count)
+                ax.bar(bins[:-1], bottom_nearly_mono,
+                       width=binwidth,
+                       align='edge',
+                       color=self.near_mono_color,
+                       alpha=0.5,
+                       bottom=i + bottom_mono,
+                       lw=0,
+                       zorder=0)
 
             if len(poly) > 0:
-                ax.hist(poly, bins=bins,
-                        color=self.poly_color,
-                        alpha=0.5,
-                        weights=0.9 * (1.0 / max_bin_count) * np_ones_like(poly),
-                        bottom=i + bottom_mono + bottom_nearly_mono,
-                        lw=0,
-                        zorder=0)
+                ax.bar(bins[:-1], np_histogram(poly, bins=bins)[0] * (0.9 / max_bin_count),
+                       width=binwidth,
+                       align='edge',
+                       color=self.poly_color,
+                       alpha=0.5,
+                       bottom=i + bottom_mono + bottom_nearly_mono,
+                       lw=0,
+                       zorder=0)
         fout.close()
 
         # overlay scatter plot elements
+        x = np_concatenate(x) if x else np_array([])
+        y = np_concatenate(y) if y else np_array([])
+        c = np_concatenate(c) if c else np_empty((0, 3))
         scatter = ax.scatter(x, y,
                              alpha=0.5,
                              s=48,
@@ -349,15 +607,18 @@ class Outliers(AbstractPlot):
 
         # make plot interactive
         if not self.skip_mpld3:
+            import mpld3
             mpld3.plugins.clear(self.fig)
             mpld3.plugins.connect(self.fig, mpld3.plugins.PointLabelTooltip(scatter, labels=labels))
             mpld3.plugins.connect(self.fig, mpld3.plugins.MousePosition(fontsize=10))
-            mpld3.plugins.connect(self.fig, AxisReplacer(rank_labels))
+            mpld3.plugins.connect(self.fig, _axis_replacer_plugin(rank_labels))
             mpld3.save_html(self.fig, plot_file[0:plot_file.rfind('.')] + '.html')
 
+        # render once and reuse the layout for both output formats
         self.fig.tight_layout(pad=1)
-        self.fig.savefig(plot_file, dpi=self.dpi)
-        self.fig.savefig(plot_file.replace('.png', '.svg'), dpi=self.dpi)
+        self.fig.canvas.draw()
+        self.fig.savefig(plot_file, dpi=self.dpi, bbox_inches=None)
+        self.fig.savefig(os.path.splitext(plot_file)[0] + '.svg', dpi=self.dpi, bbox_inches=None)
 
     def _median_outlier_file(self,
                              rel_dists,
@@ -380,6 +641,8 @@ class Outliers(AbstractPlot):
             Desired name of output table.
         """
 
+        taxa_for_dist_inference = frozenset(taxa_for_dist_inference)
+
         # determine median relative distance for each rank
         median_rel_dist = {}
         for rank, d in rel_dists.items():
@@ -389,54 +652,45 @@ class Outliers(AbstractPlot):
 
             median_rel_dist[rank] = np_median(v)
 
-        fout_rank = open(median_rank_file, 'w')
-        median_str = []
-        for rank in sorted(median_rel_dist.keys()):
-            if viral:
-                rank_label = VIRAL_RANK_LABELS[rank]
+        rank_labels = VIRAL_RANK_LABELS if viral else Taxonomy.rank_labels
+        with open(median_rank_file, 'w') as fout_rank:
+            json.dump({rank_labels[r]: float(median_rel_dist[r])
+                       for r in sorted(median_rel_dist.keys())}, fout_rank)
+            fout_rank.write('\n')
+
+        test_ranks = list(median_rel_dist)
+        rank_medians = np_array([median_rel_dist[r] for r in test_ranks])
+        closest_rank_labels = [Taxonomy.rank_labels[r] for r in test_ranks]
+
+        rows = []
+        for rank in sorted(rel_dists.keys()):
+            if rank in median_rel_dist:
+                dists = np_fromiter(rel_dists[rank].values(),
+                                    dtype=float,
+                                    count=len(rel_dists[rank]))
+                closest, codes, deltas = _classify_taxa(dists,
+                                                        rank_medians,
+                                                        median_rel_dist[rank])
+
+                for j, clade_label in enumerate(rel_dists[rank]):
+                    rows.append('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
+                                                                  ';'.join(gtdb_parent_ranks[clade_label]),
+                                                                  dists[j],
+                                                                  deltas[j],
+                                                                  closest_rank_labels[closest[j]],
+                                                                  CLASSIFICATION_LABELS[codes[j]]))
             else:
-                rank_label = Taxonomy.rank_labels[rank]
-            median_str.append('"' + rank_label + '":' + str(median_rel_dist[rank]))
-        fout_rank.write('{' + ','.join(median_str) + '}\n')
-        fout_rank.close()
-
-        fout = open(output_file, 'w')
+                for clade_label, dist in rel_dists[rank].items():
+                    rows.append('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
+                                                                  ';'.join(gtdb_parent_ranks[clade_label]),
+                                                                  dist,
+                                                                  -1,
+                                                                  'NA',
+                                                                  'Insufficent data to calcualte median for rank.'))
+
+        fout = open(output_file, 'w', buffering=1 << 20)
         fout.write('Taxa\tGTDB taxonomy\tMedian distance\tMean difference\tClosest rank\tClassification\n')
-
-        for i, rank in enumerate(sorted(rel_dists.keys())):
-            for clade_label, dist in rel_dists[rank].items():
-                if rank in median_rel_dist:
-                    delta = dist - median_rel_dist[rank]
-                    closest_rank_dist = 1e10
-                    for test_rank, test_median in median_rel_dist.items():
-                        abs_dist = abs(dist - test_median)
-                        if abs_dist < closest_rank_dist:
-                            closest_rank_dist = abs_dist
-                            closest_rank = Taxonomy.rank_labels[test_rank]
-
-                    classification = "OK"
-                    if delta < -0.2:
-                        classification = "very overclassified"
-                    elif delta < -0.1:
-                        classification = "overclassified"
-                    elif delta > 0.2:
-                        classification = "very underclassified"
-                    elif delta > 0.1:
-                        classification = "underclassified"
-
-                    fout.write('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
-                                                                 ';'.join(gtdb_parent_ranks[clade_label]),
-                                                                 dist,
-                                                                 delta,
-                                                                 closest_rank,
-                                                                 classification))
-                else:
-                    fout.write('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
-                                                                 ';'.join(gtdb_parent_ranks[clade_label]),
-                                                                 dist,
-                                                                 -1,
-                                                                 'NA',
-                                                                 'Insufficent data to calcualte median for rank.'))
+        fout.writelines(rows)
         fout.close()
 
     def taxa_median_rd(self, phylum_rel_dists):
@@ -446,15 +700,43 @@ class Outliers(AbstractPlot):
         ----------
         phylum_rel_dists: phylum_rel_dists[phylum][rank_index][taxon] -> relative divergences
             Relative divergence of taxon at each rank for different phylum-level rootings.
+
+        Returns
+        -------
+        dict : d[rank_index][taxon] -> relative divergences over all rootings
+        dict : d[rank_index][taxon] -> median relative divergence
         """
 
+        cached_input, cached_result = self._taxa_median_rd_cache
+        if cached_input is phylum_rel_dists:
+            return cached_result
+
         medians_for_taxa = defaultdict(lambda: defaultdict(list))
         for p in phylum_rel_dists:
             for rank, d in phylum_rel_dists[p].items():
                 for taxon, dist in d.items():
                     medians_for_taxa[rank][taxon].append(dist)
 
-        return medians_for_taxa
+        # calculate median over all rootings once so downstream consumers
+        # do not need to recompute it per taxon; taxa at a rank are stacked
+        # into a single (taxa, rootings) matrix, padded with NaN for
+        # rootings where a taxon is absent, so all medians are computed
+        # with a single vectorized reduction
+        num_rootings = len(phylum_rel_dists)
+        taxon_median_rd = {}
+        for rank, d in medians_for_taxa.items():
+            dist_matrix = np_full((len(d), num_rootings), np_nan)
+            for j, dists in enumerate(d.values()):
+                dist_matrix[j, :len(dists)] = dists
+            medians = np_nanmedian(dist_matrix, axis=1)
+            taxon_median_rd[rank] = dict(zip(d.keys(), medians.tolist()))
+
+        # retain a reference to the input itself so the identity check
+        # above cannot be fooled by a recycled object id
+        self._taxa_median_rd_cache = (phylum_rel_dists,
+                                      (medians_for_taxa, taxon_median_rd))
+
+        return medians_for_taxa, taxon_median_rd
 
     def rank_median_rd(self, phylum_rel_dists, taxa_for_dist_inference):
         """Calculate median relative divergence for each rank.
@@ -467,11 +749,13 @@ class Outliers(AbstractPlot):
             Taxa to considered when inferring distributions.
         """
 
-        medians_for_taxa = self.taxa_median_rd(phylum_rel_dists)
+        taxa_for_dist_inference = frozenset(taxa_for_dist_inference)
+
+        _, taxon_median_rd = self.taxa_median_rd(phylum_rel_dists)
 
         median_for_rank = {}
-        for i, rank in enumerate(sorted(medians_for_taxa.keys())):
-            v = [np_median(dists) for taxon, dists in medians_for_taxa[rank].items() if
+        for rank in sorted(taxon_median_rd.keys()):
+            v = [m for taxon, m in taxon_median_rd[rank].items() if
                  taxon in taxa_for_dist_inference]
 
             if v:
@@ -499,19 +783,31 @@ class Outliers(AbstractPlot):
             Desired name of output plot.
         """
 
+        taxa_for_dist_inference = frozenset(taxa_for_dist_inference)
+
         self.fig.clear()
         self.fig.set_size_inches(12, 6)
         ax = self.fig.add_subplot(111)
 
         # determine median relative distance for each taxa
-        medians_for_taxa = self.taxa_median_rd(phylum_rel_dists)
+        medians_for_taxa, taxon_median_rd = self.taxa_median_rd(phylum_rel_dists)
+
+        # histogram bin edges are identical for every rank
+        binwidth = 0.025
+        bins = np_arange(0, 1.0 + binwidth, binwidth)
+
+        # cache rank ordering and labels used by each of the loops below
+        sorted_ranks = sorted(medians_for_taxa.keys())
+        rank_label_cache = [Taxonomy.rank_labels[r] for r in sorted_ranks]
+        highlight_taxa = frozenset(highlight_taxa)
 
         # create percentile and classification boundary lines
         percentiles = {}
-        for i, rank in enumerate(sorted(medians_for_taxa.keys())):
-            v = [np_median(dists) for taxon, dists in medians_for_taxa[rank].items() if
-                 taxon in taxa_for_dist_inference]
-            if not v:
+        for i, rank in enumerate(sorted_ranks):
+            v = np_fromiter((m for taxon, m in taxon_median_rd[rank].items()
+                             if taxon in taxa_for_dist_inference),
+                            dtype=float)
+            if v.size == 0:
                 # not taxa at rank suitable for creating classification boundaries
                 continue
 
@@ -535,66 +831,76 @@ class Outliers(AbstractPlot):
         c = []
         labels = []
         rank_labels = []
-        for i, rank in enumerate(sorted(medians_for_taxa.keys())):
-            rank_label = Taxonomy.rank_labels[rank]
-            rank_labels.append(rank_label.capitalize() + ' ({:,})'.format(len(medians_for_taxa[rank])))
-
-            mono = []
-            poly = []
-            near_mono = []
-            for clade_label, dists in medians_for_taxa[rank].items():
-                md = np_median(dists)
-                x.append(md)
-                y.append(i)
-                labels.append(clade_label)
-
-                if ((highlight_polyphyly and fmeasure[clade_label] < fmeasure_mono) or clade_label in highlight_taxa):
-                    c.append(self.poly_color)
-                    poly.append(md)
-                elif (highlight_polyphyly and fmeasure[clade_label] != 1.0):
-                    c.append(self.near_mono_color)
-                    near_mono.append(md)
-                else:
-                    c.append(self.mono_color)
-                    mono.append(md)
+        for i, rank in enumerate(sorted_ranks):
+            rank_labels.append(rank_label_cache[i].capitalize() + ' ({:,})'.format(len(medians_for_taxa[rank])))
+
+            taxa_labels = list(taxon_median_rd[rank].keys())
+            num_taxa = len(taxa_labels)
+            medians = np_fromiter(taxon_median_rd[rank].values(), dtype=float, count=num_taxa)
+
+            mono_mask, near_mono_mask, poly_mask = self._taxon_category_masks(taxa_labels,
+                                                                              highlight_polyphyly,
+                                                                              highlight_taxa,
+                                                                              fmeasure,
+                                                                              fmeasure_mono)
+
+            colors = np_empty((num_taxa, 3))
+            colors[mono_mask] = self.mono_color
+            colors[near_mono_mask] = self.near_mono_color
+            colors[poly_mask] = self.poly_color
+
+            x.append(medians)
+            y.append(np_full(num_taxa, i, dtype=float))
+            c.append(colors)
+            labels.extend(taxa_labels)
+
+            mono = medians[mono_mask]
+            near_mono = medians[near_mono_mask]
+            poly = medians[poly_mask]
 
             # histogram for each rank
-            binwidth = 0.025
-            bins = np_arange(0, 1.0 + binwidth, binwidth)
-            max_bin_count = max(np_histogram(mono + near_mono + poly, bins=bins)[0])
+            max_bin_count = max(np_histogram(medians, bins=bins)[0])
+            if max_bin_count == 0:
+                # all bins empty; avoid division by zero below
+                max_bin_count = 1
 
             mono_bottom = 0
             near_mono_bottom = 0
-            mono = np_array(mono)
-            near_mono = np_array(near_mono)
-            poly = np_array(poly)
             if len(mono) > 0:
-                mono_bottom, b, p = ax.hist(mono, bins=bins,
-                                            color=self.mono_color,
-                                            alpha=0.5,
-                                            weights=0.9 * (1.0 / max_bin_count) * np_ones_like(mono),
-                                            bottom=i,
-                                            lw=0,
-                                            zorder=0)
+                mono_bottom = np_histogram(mono, bins=bins)[0] * (0.9 / max_bin_count)
+                ax.bar(bins[:-1], mono_bottom,
+                       width=binwidth,
+                       align='edge',
+                       color=self.mono_color,
+                       alpha=0.5,
+                       bottom=i,
+                       lw=0,
+                       zorder=0)
 
             if len(near_mono) > 0:
-                near_mono_bottom, b, p = ax.hist(near_mono, bins=bins,
-                                                 color=self.near_mono_color,
-                                                 alpha=0.5,
-                                                 weights=0.9 * (1.0 / max_bin_count) * np_ones_like(near_mono),
-                                                 bottom=i + mono_bottom,
-                                                 lw=0,
-                                                 zorder=0)
+                near_mono_bottom = np_histogram(near_mono, bins=bins)[0] * (0.9 / max_bin_count)
+                ax.bar(bins[:-1], near_mono_bottom,
+                       width=binwidth,
+                       align='edge',
+                       color=self.near_mono_color,
+                       alpha=0.5,
+                       bottom=i + mono_bottom,
+                       lw=0,
+                       zorder=0)
 
             if len(poly) > 0:
-                ax.hist(poly, bins=bins,
-                        color=self.poly_color,
-                        alpha=0.5,
-                        weights=0.9 * (1.0 / max_bin_count) * np_ones_like(poly),
-                        bottom=i + mono_bottom + near_mono_bottom,
-                        lw=0,
-                        zorder=0)
-
+                ax.bar(bins[:-1], np_histogram(poly, bins=bins)[0] * (0.9 / max_bin_count),
+                       width=binwidth,
+                       align='edge',
+                       color=self.poly_color,
+                       alpha=0.5,
+                       bottom=i + mono_bottom + near_mono_bottom,
+                       lw=0,
+                       zorder=0)
+
+        x = np_concatenate(x) if x else np_array([])
+        y = np_concatenate(y) if y else np_array([])
+        c = np_concatenate(c) if c else np_empty((0, 3))
         scatter = ax.scatter(x, y,
                              alpha=0.5,
                              s=48,
@@ -619,15 +925,18 @@ class Outliers(AbstractPlot):
 
         # make plot interactive
         if not self.skip_mpld3:
+            import mpld3
             mpld3.plugins.clear(self.fig)
             mpld3.plugins.connect(self.fig, mpld3.plugins.PointLabelTooltip(scatter, labels=labels))
             mpld3.plugins.connect(self.fig, mpld3.plugins.MousePosition(fontsize=10))
-            mpld3.plugins.connect(self.fig, AxisReplacer(rank_labels))
+            mpld3.plugins.connect(self.fig, _axis_replacer_plugin(rank_labels))
             mpld3.save_html(self.fig, plot_file[0:plot_file.rfind('.')] + '.html')
 
+        # render once and reuse the layout for both output formats
         self.fig.tight_layout(pad=1)
-        self.fig.savefig(plot_file, dpi=self.dpi)
-        self.fig.savefig(plot_file.replace('.png', '.svg'), dpi=self.dpi)
+        self.fig.canvas.draw()
+        self.fig.savefig(plot_file, dpi=self.dpi, bbox_inches=None)
+        self.fig.savefig(os.path.splitext(plot_file)[0] + '.svg', dpi=self.dpi, bbox_inches=None)
 
     def _median_summary_outlier_file(self, phylum_rel_dists,
                                      taxa_for_dist_inference,
@@ -654,67 +963,97 @@ class Outliers(AbstractPlot):
         """
 
         # determine median relative distance for each taxa
-        medians_for_taxa = self.taxa_median_rd(phylum_rel_dists)
+        medians_for_taxa, taxon_median_rd = self.taxa_median_rd(phylum_rel_dists)
 
         # determine median relative distance for each rank
         median_for_rank = self.rank_median_rd(phylum_rel_dists, taxa_for_dist_inference)
 
-        fout_rank = open(rank_file, 'w')
-        median_str = []
-        for rank in sorted(median_for_rank.keys()):
-            median_str.append('"' + Taxonomy.rank_labels[rank] + '":' + str(median_for_rank[rank]))
-        fout_rank.write('{' + ','.join(median_str) + '}\n')
-        fout_rank.close()
+        with open(rank_file, 'w') as fout_rank:
+            json.dump({Taxonomy.rank_labels[r]: float(median_for_rank[r])
+                       for r in sorted(median_for_rank.keys())}, fout_rank)
+            fout_rank.write('\n')
+
+        test_ranks = list(median_for_rank)
+        rank_medians = np_array([median_for_rank[r] for r in test_ranks])
+        closest_rank_labels = [Taxonomy.rank_labels[r] for r in test_ranks]
 
-        fout = open(outlier_table, 'w')
+        rows = []
+        for rank in sorted(median_for_rank.keys()):
+            taxon_medians = np_fromiter(taxon_median_rd[rank].values(),
+                                        dtype=float,
+                                        count=len(taxon_median_rd[rank]))
+            closest, codes, deltas = _classify_taxa(taxon_medians,
+                                                    rank_medians,
+                                                    median_for_rank[rank])
+
+            if verbose_table:
+                for j, clade_label in enumerate(taxon_median_rd[rank]):
+                    rows.append('%s\t%s\t%.2f\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
+                                                                        ';'.join(gtdb_parent_ranks[clade_label]),
+                                                                        taxon_medians[j],
+                                                                        median_for_rank[rank],
+                                                                        deltas[j],
+                                                                        closest_rank_labels[closest[j]],
+                                                                        CLASSIFICATION_LABELS[codes[j]]))
+            else:
+                for j, clade_label in enumerate(taxon_median_rd[rank]):
+                    rows.append('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
+                                                                  ';'.join(gtdb_parent_ranks[clade_label]),
+                                                                  taxon_medians[j],
+                                                                  deltas[j],
+                                                                  closest_rank_labels[closest[j]],
+                                                                  CLASSIFICATION_LABELS[codes[j]]))
+
+        fout = open(outlier_table, 'w', buffering=1 << 20)
         if verbose_table:
             fout.write('Taxa\tGTDB taxonomy\tMedian distance')
             fout.write('\tMedian of rank\tMedian difference')
             fout.write('\tClosest rank\tClassifciation\n')
         else:
             fout.write('Taxa\tGTDB taxonomy\tMedian distance\tMedian difference\tClosest rank\tClassification\n')
-
-        for rank in sorted(median_for_rank.keys()):
-            for clade_label, dists in medians_for_taxa[rank].items():
-                dists = np_array(dists)
-
-                taxon_median = np_median(dists)
-                delta = taxon_median - median_for_rank[rank]
-
-                closest_rank_dist = 1e10
-                for test_rank, test_median in median_for_rank.items():
-                    abs_dist = abs(taxon_median - test_median)
-                    if abs_dist < closest_rank_dist:
-                        closest_rank_dist = abs_dist
-                        closest_rank = Taxonomy.rank_labels[test_rank]
-
-                classification = "OK"
-                if delta < -0.2:
-                    classification = "very overclassified"
-                elif delta < -0.1:
-                    classification = "overclassified"
-                elif delta > 0.2:
-                    classification = "very underclassified"
-                elif delta > 0.1:
-                    classification = "underclassified"
-
-                if verbose_table:
-                    fout.write('%s\t%s\t%.2f\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
-                                                                       ';'.join(gtdb_parent_ranks[clade_label]),
-                                                                       taxon_median,
-                                                                       median_for_rank[rank],
-                                                                       delta,
-                                                                       closest_rank,
-                                                                       classification))
-                else:
-                    fout.write('%s\t%s\t%.3f\t%.3f\t%s\t%s\n' % (clade_label,
-                                                                 ';'.join(gtdb_parent_ranks[clade_label]),
-                                                                 taxon_median,
-                                                                 delta,
-                                                                 closest_rank,
-                                                                 classification))
+        fout.writelines(rows)
         fout.close()
 
+    def _scale_edge_lengths(self, tree, rel_dists=None):
+        """Set edge lengths to the relative divergence between nodes and their parents.
+
+        Edge lengths are computed with a single vectorized difference
+        between each node and its parent instead of per-node attribute
+        lookups. Nodes must already have their rel_dist attribute set.
+
+        Parameters
+        ----------
+        tree : Tree
+          Dendropy tree decorated with rel_dist node attributes.
+        rel_dists : ndarray, optional
+          Relative divergence of each node in preorder; gathered from
+          the rel_dist node attributes when not given.
+
+        Returns
+        -------
+        bool
+          True if any edge length is negative.
+        """
+
+        nodes = list(tree.preorder_node_iter())
+        for i, n in enumerate(nodes):
+            n.preorder_index = i
+
+        if rel_dists is None:
+            rel_dists = np_fromiter((n.rel_dist for n in nodes),
+                                    dtype=float,
+                                    count=len(nodes))
+        parent_indices = np_fromiter(
+            (n.parent_node.preorder_index if n.parent_node else 0 for n in nodes),
+            dtype=int,
+            count=len(nodes))
+        edge_lengths = rel_dists - rel_dists[parent_indices]
+
+        for n, edge_length in zip(nodes[1:], edge_lengths[1:].tolist()):
+            n.edge_length = edge_length
+
+        return bool((edge_lengths[1:] < 0).any())
+
     def rd_fixed_root(self, tree, taxa_for_dist_inference):
         """Scale tree and calculate relative divergence over a single fixed root.
 
@@ -732,9 +1071,7 @@ class Outliers(AbstractPlot):
 
         # create scaled tree
         rd.decorate_rel_dist(tree)
-        for n in tree.preorder_node_iter(lambda n: n != tree.seed_node):
-            rd_to_parent = n.rel_dist - n.parent_node.rel_dist
-            n.edge_length = rd_to_parent
+        self._scale_edge_lengths(tree)
 
         return rel_dists
 
@@ -755,9 +1092,7 @@ class Outliers(AbstractPlot):
 
         # create scaled tree
         rd.decorate_rel_dist(tree)
-        for n in tree.preorder_node_iter(lambda n: n != tree.seed_node):
-            rd_to_parent = n.rel_dist - n.parent_node.rel_dist
-            n.edge_length = rd_to_parent
+        self._scale_edge_lengths(tree)
 
         return rel_dists
 
@@ -777,7 +1112,7 @@ class Outliers(AbstractPlot):
 
         # read taxonomy from tree
         if not taxonomy:
-            taxonomy = Taxonomy().read_from_tree(tree,
+            taxonomy = TAXONOMY_UTILS.read_from_tree(tree,
                                                  warnings=False)
 
         # get list of phyla level lineages
@@ -791,63 +1126,61 @@ class Outliers(AbstractPlot):
             sys.exit(1)
 
         # give each node a unique id
-        for i, n in enumerate(tree.preorder_node_iter()):
+        preorder_nodes = list(tree.preorder_node_iter())
+        for i, n in enumerate(preorder_nodes):
             n.id = i
 
-        # calculate relative divergence for tree rooted on each phylum
+        # calculate relative divergence for tree rooted on each phylum;
+        # divergences are stored in a dense (node, rooting) matrix with
+        # NaN marking rootings where a node fell in the outgroup, which
+        # avoids accumulating a Python list of values per node
         phylum_rel_dists = {}
-        rel_node_dists = defaultdict(list)
-        rd = RelativeDistance()
-        for p in phyla:
+        rel_node_dists = np_full((len(preorder_nodes), len(phyla)), np_nan)
+
+        # each rooting is independent so phyla are processed in parallel;
+        # workers are forked so they inherit the parsed tree and its node ids
+        num_workers = min(len(phyla), multiprocessing.cpu_count())
+        self.logger.info('Calculating information over %d phyla rootings with %d processes.' % (
+            len(phyla), num_workers))
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(num_workers,
+                      initializer=_phylum_rooting_init,
+                      initargs=(self, tree, taxonomy)) as pool:
+            results = pool.map(_phylum_rooting_worker, phyla)
+
+        for phylum_idx, (p, (rel_dists, node_dists)) in enumerate(zip(phyla, results)):
             phylum = p.replace('p__', '').replace(' ', '_').lower()
-            self.logger.info('Calculating information with rooting on %s.' % phylum.capitalize())
-
-            cur_tree = self.root_with_outgroup(tree, taxonomy, p)
-
-            # calculate relative distance to taxa
-            rel_dists = rd.rel_dist_to_named_clades(cur_tree)
-            rel_dists.pop(0, None)  # remove results for Domain
-
-            # remove named groups in outgroup
-            children = Taxonomy().children(p, taxonomy)
-            for r in rel_dists.keys():
-                rel_dists[r].pop(p, None)
-
-            for t in children:
-                for r in rel_dists.keys():
-                    rel_dists[r].pop(t, None)
-
             phylum_rel_dists[phylum] = rel_dists
 
-            # calculate relative distance to all nodes
-            rd.decorate_rel_dist(cur_tree)
-
-            # determine which lineages represents the 'ingroup'
-            ingroup_subtree = None
-            for c in cur_tree.seed_node.child_node_iter():
-                _support, taxon_name, _auxiliary_info = parse_label(c.label)
-                if not taxon_name or p not in taxon_name:
-                    ingroup_subtree = c
-                    break
-
-            # do a preorder traversal of 'ingroup' and record relative divergence to nodes
-            for n in ingroup_subtree.preorder_iter():
-                rel_node_dists[n.id].append(n.rel_dist)
+            for node_id, node_dist in node_dists:
+                rel_node_dists[node_id, phylum_idx] = node_dist
 
         return phylum_rel_dists, rel_node_dists
 
     def _write_rd(self, tree, output_rd_file):
         """Write out relative divergences for each node."""
 
-        fout = open(output_rd_file, 'w')
+        # determine left and right taxa that define each node with a
+        # single postorder sweep instead of walking the full subtree
+        # of every internal node
+        for n in tree.postorder_node_iter():
+            if n.is_leaf():
+                n.first_leaf = n
+                n.last_leaf = n
+            else:
+                children = n.child_nodes()
+                n.first_leaf = children[0].first_leaf
+                n.last_leaf = children[-1].last_leaf
+
+        rows = []
         for n in tree.preorder_node_iter():
             if n.is_leaf():
-                fout.write('%s\t%f\n' % (n.taxon.label, n.rel_dist))
+                rows.append('%s\t%f\n' % (n.taxon.label, n.rel_dist))
             else:
-                # get left and right taxa that define this node
-                taxa = list(n.preorder_iter(lambda n: n.is_leaf()))
-                fout.write('%s|%s\t%f\n' % (taxa[0].taxon.label, taxa[-1].taxon.label, n.rel_dist))
+                rows.append('%s|%s\t%f\n' % (n.first_leaf.taxon.label, n.last_leaf.taxon.label, n.rel_dist))
 
+        fout = open(output_rd_file, 'w', buffering=1 << 20)
+        fout.writelines(rows)
         fout.close()
 
     def _write_rd_tree(self, tree, rel_node_dists, output_tree):
@@ -856,11 +1189,12 @@ class Outliers(AbstractPlot):
         # copy tree so node labels aren't changed in original tree
         red_tree = copy.deepcopy(tree)
 
+        node_medians = node_median_rd(rel_node_dists)
         for node_id, n in enumerate(red_tree.preorder_node_iter()):
             if n == red_tree.seed_node:
                 red = 0
             else:
-                red = np_median(rel_node_dists[node_id])
+                red = node_medians[node_id]
 
             red_str = "|RED={:.3f}".format(red)
             if n.is_leaf():
@@ -879,15 +1213,13 @@ class Outliers(AbstractPlot):
     def read_fmeasure(self, fmeasure_table):
         """Read table with F-measure for taxa."""
 
-        fmeasure = {}
         with open(fmeasure_table) as f:
-            f.readline()
+            lines = f.read().splitlines()
 
-            for line in f:
-                line_split = line.strip().split('\t')
-
-                taxa = line_split[0]
-                fmeasure[taxa] = float(line_split[2])
+        fmeasure = {}
+        for line in lines[1:]:
+            line_split = line.split('\t')
+            fmeasure[line_split[0]] = float(line_split[2])
 
         return fmeasure
 
@@ -944,9 +1276,13 @@ class Outliers(AbstractPlot):
 
         input_tree_name = os.path.splitext(os.path.basename(input_tree))[0]
 
+        # the tree itself is never restructured (rerooting is performed on
+        # clones), so a single preorder traversal can be reused throughout
+        preorder_nodes = list(tree.preorder_node_iter())
+
         # pull taxonomy from tree and file
         self.logger.info('Reading taxonomy.')
-        taxonomy = Taxonomy().read(taxonomy_file)
+        taxonomy = TAXONOMY_UTILS.read(taxonomy_file)
 
         if viral:
             self.logger.info('Translating viral prefixes.')
@@ -956,10 +1292,10 @@ class Outliers(AbstractPlot):
             translate_viral_tree(tree)
         else:
             self.logger.info('Reading taxonomy from tree.')
-            tree_taxonomy = Taxonomy().read_from_tree(input_tree,
+            tree_taxonomy = TAXONOMY_UTILS.read_from_tree(tree,
                                                       warnings=False)
 
-        gtdb_parent_ranks = Taxonomy().parents(tree_taxonomy)
+        gtdb_parent_ranks = TAXONOMY_UTILS.parents(tree_taxonomy)
 
         # read trusted taxa
         trusted_taxa = None
@@ -992,7 +1328,7 @@ class Outliers(AbstractPlot):
         else:
             # plot every taxon defined in tree
             taxa_to_plot = set()
-            for node in tree.preorder_node_iter():
+            for node in preorder_nodes:
                 support, taxon, _auxiliary_info = parse_label(node.label)
                 if taxon:
                     taxon = taxon.split(';')[-1].strip()  # get most specific taxon from compound names
@@ -1015,7 +1351,7 @@ class Outliers(AbstractPlot):
                     # count number of subordinate children
                     rank_prefix = taxon[0:3]
                     if min_children > 0 and rank_prefix != 's__':
-                        child_rank_index = Taxonomy().rank_index[rank_prefix] + 1
+                        child_rank_index = Taxonomy.rank_index[rank_prefix] + 1
                         child_rank_prefix = Taxonomy.rank_prefixes[child_rank_index]
                         subordinate_taxa = set()
                         for leaf in node.leaf_iter():
@@ -1031,6 +1367,8 @@ class Outliers(AbstractPlot):
 
                     taxa_to_plot.add(taxon)
 
+        taxa_to_plot = frozenset(taxa_to_plot)
+
         # highlight taxa
         highlight_taxa = set()
         if highlight_taxa_file:
@@ -1076,9 +1414,7 @@ class Outliers(AbstractPlot):
 
             # restrict to taxa of interest
             if taxa_to_plot:
-                for r in rel_dists:
-                    for k in set(rel_dists[r].keys()) - set(taxa_to_plot):
-                        del rel_dists[r][k]
+                _restrict_taxa_to_plot(rel_dists, taxa_to_plot)
 
             # report number of taxa at each rank
             print('')
@@ -1093,67 +1429,86 @@ class Outliers(AbstractPlot):
                 tree,
                 taxa_for_dist_inference)
 
-            # set edge lengths to median value over all rootings
+            # compute median relative divergence of each node over all
+            # rootings with a single vectorized reduction
+            node_medians = node_median_rd(rel_node_dists)
+
+            # set edge lengths to median value over all rootings; node
+            # medians are passed through directly since node ids match
+            # the preorder ordering expected by _scale_edge_lengths
+            node_medians[0] = 0.0
             tree.seed_node.rel_dist = 0.0
-            for n in tree.preorder_node_iter(lambda n: n != tree.seed_node):
-                n.rel_dist = np_median(rel_node_dists[n.id])
-                rd_to_parent = n.rel_dist - n.parent_node.rel_dist
-                if rd_to_parent < 0:
-                    self.logger.warning('Not all branches are positive after scaling.')
-                n.edge_length = rd_to_parent
-
-            for phylum, rel_dists in phylum_rel_dists.items():
-                phylum_dir = os.path.join(self.output_dir, phylum)
-                if not os.path.exists(phylum_dir):
-                    os.makedirs(phylum_dir)
-
-                # restrict to taxa of interest
-                if taxa_to_plot:
-                    for r in rel_dists:
-                        for k in set(rel_dists[r].keys()) - set(taxa_to_plot):
-                            del rel_dists[r][k]
-
-                # create distribution plot
-                distribution_table = os.path.join(phylum_dir, '%s.rank_distribution.tsv' % phylum)
-                plot_file = os.path.join(phylum_dir, '%s.rank_distribution.png' % phylum)
-                median_rank_file = os.path.join(phylum_dir, '%s.median_red.dict' % phylum)
-                self._distribution_plot(rel_dists,
-                                        taxa_for_dist_inference,
-                                        highlight_polyphyly,
-                                        highlight_taxa,
-                                        distribution_table,
-                                        fmeasure,
-                                        fmeasure_mono,
-                                        plot_file,
-                                        viral)
-
-                median_outlier_table = os.path.join(phylum_dir, '%s.median_outlier.tsv' % phylum)
-                self._median_outlier_file(rel_dists,
-                                          taxa_for_dist_inference,
-                                          gtdb_parent_ranks,
-                                          viral,
-                                          median_outlier_table,
-                                          median_rank_file)
-
-                if viral:
-                    rev_translate_output_file(distribution_table)
-                    rev_translate_output_file(plot_file)
-                    rev_translate_output_file(median_outlier_table)
-
-            self._distribution_summary_plot(phylum_rel_dists,
+            for n in preorder_nodes[1:]:
+                n.rel_dist = node_medians[n.id]
+            if self._scale_edge_lengths(tree, node_medians):
+                self.logger.warning('Not all branches are positive after scaling.')
+
+            # table writing is pure I/O so it is overlapped with plot
+            # rendering; plotting itself must stay on this thread as
+            # the figure is shared between plots
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                table_futures = []
+                for phylum, rel_dists in phylum_rel_dists.items():
+                    phylum_dir = os.path.join(self.output_dir, phylum)
+                    os.makedirs(phylum_dir, exist_ok=True)
+
+                    # restrict to taxa of interest
+                    if taxa_to_plot:
+                        _restrict_taxa_to_plot(rel_dists, taxa_to_plot)
+
+                    distribution_table = os.path.join(phylum_dir, '%s.rank_distribution.tsv' % phylum)
+                    plot_file = os.path.join(phylum_dir, '%s.rank_distribution.png' % phylum)
+                    median_rank_file = os.path.join(phylum_dir, '%s.median_red.dict' % phylum)
+                    median_outlier_table = os.path.join(phylum_dir, '%s.median_outlier.tsv' % phylum)
+
+                    table_future = executor.submit(self._median_outlier_file,
+                                                   rel_dists,
+                                                   taxa_for_dist_inference,
+                                                   gtdb_parent_ranks,
+                                                   viral,
+                                                   median_outlier_table,
+                                                   median_rank_file)
+                    table_futures.append(table_future)
+
+                    # create distribution plot
+                    self._distribution_plot(rel_dists,
                                             taxa_for_dist_inference,
                                             highlight_polyphyly,
                                             highlight_taxa,
+                                            distribution_table,
                                             fmeasure,
                                             fmeasure_mono,
-                                            dist_plot_file)
-
-            self._median_summary_outlier_file(phylum_rel_dists,
-                                              taxa_for_dist_inference,
-                                              gtdb_parent_ranks,
-                                              summary_median_outlier_table,
-                                              summary_median_rank_file,
-                                              verbose_table)
+                                            plot_file,
+                                            viral)
+
+                    if viral:
+                        table_future.result()
+                        rev_translate_output_file(distribution_table)
+                        rev_translate_output_file(plot_file)
+                        rev_translate_output_file(median_outlier_table)
+
+                # warm the taxa_median_rd cache before the summary table
+                # and summary plot consume it from different threads
+                self.taxa_median_rd(phylum_rel_dists)
+
+                table_futures.append(executor.submit(self._median_summary_outlier_file,
+                                                     phylum_rel_dists,
+                                                     taxa_for_dist_inference,
+                                                     gtdb_parent_ranks,
+                                                     summary_median_outlier_table,
+                                                     summary_median_rank_file,
+                                                     verbose_table))
+
+                self._distribution_summary_plot(phylum_rel_dists,
+                                                taxa_for_dist_inference,
+                                                highlight_polyphyly,
+                                                highlight_taxa,
+                                                fmeasure,
+                                                fmeasure_mono,
+                                                dist_plot_file)
+
+                for table_future in table_futures:
+                    table_future.result()
 
             output_rd_tree = os.path.join(self.output_dir, '{}.red_decorated.tree'.format(input_tree_name))
             self._write_rd_tree(tree, rel_node_dists, output_rd_tree)